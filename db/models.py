@@ -3,14 +3,18 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from sqlalchemy import (
     JSON,
     Boolean,
     Column,
+    Computed,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     create_engine,
@@ -18,6 +22,33 @@ from sqlalchemy import (
 from sqlalchemy.orm import DeclarativeBase, Session, relationship, sessionmaker
 
 
+# Stream samples are packed as raw numpy blobs rather than JSON arrays:
+# 4-8x smaller rows and no JSON parse on read. float32 keeps ~1m coordinate
+# precision; int16 covers any heart rate value.
+STREAM_COORD_DTYPE = np.float32
+STREAM_HR_DTYPE = np.int16
+
+
+def pack_stream(values: list | None, dtype) -> bytes | None:
+    """Pack a list of stream samples into a raw binary blob."""
+    if values is None:
+        return None
+    return np.asarray(values, dtype=dtype).tobytes()
+
+
+def unpack_stream(blob: bytes | None, dtype, pairs: bool = False) -> list | None:
+    """Unpack a raw binary blob back into a list of samples.
+
+    With pairs=True the flat blob is reshaped into [lat, lon] pairs.
+    """
+    if blob is None:
+        return None
+    arr = np.frombuffer(blob, dtype=dtype)
+    if pairs:
+        arr = arr.reshape(-1, 2)
+    return arr.tolist()
+
+
 class Base(DeclarativeBase):
     """Base class for all models."""
     pass
@@ -36,6 +67,18 @@ class Activity(Base):
     activity_type = Column(String, nullable=True)
     start_time = Column(DateTime, nullable=True)
 
+    # Stored generated period keys, indexed so time-series GROUP BYs read an
+    # index range instead of running strftime over every row
+    start_year_month = Column(
+        String, Computed("strftime('%Y-%m', start_time)", persisted=True), index=True
+    )
+    start_year_week = Column(
+        String, Computed("strftime('%Y-%W', start_time)", persisted=True), index=True
+    )
+    start_year = Column(
+        String, Computed("strftime('%Y', start_time)", persisted=True), index=True
+    )
+
     # Distance and time
     distance = Column(Float, nullable=True)  # meters
     moving_time = Column(Float, nullable=True)  # seconds
@@ -78,6 +121,47 @@ class Activity(Base):
     fit_file = relationship("FitFile", back_populates="activity", uselist=False)
     stream = relationship("Stream", back_populates="activity", uselist=False)
 
+    # Descending index so recent-activity queries walk the index instead of
+    # sorting, plus partial descending indexes that turn each personal-record
+    # ORDER BY ... LIMIT 1 into a one-row probe
+    __table_args__ = (
+        Index("ix_activity_start_time", start_time.desc()),
+        # Covering index: the type breakdown groups on activity_type and
+        # aggregates distance, so it can run entirely inside the index;
+        # DISTINCT activity_type uses the prefix
+        Index("ix_activity_type", activity_type, distance),
+        Index(
+            "ix_activity_distance_desc",
+            distance.desc(),
+            sqlite_where=distance.isnot(None),
+        ),
+        Index(
+            "ix_activity_moving_time_desc",
+            moving_time.desc(),
+            sqlite_where=moving_time.isnot(None),
+        ),
+        Index(
+            "ix_activity_elevation_gain_desc",
+            elevation_gain.desc(),
+            sqlite_where=elevation_gain.isnot(None),
+        ),
+        Index(
+            "ix_activity_max_speed_desc",
+            max_speed.desc(),
+            sqlite_where=max_speed.isnot(None),
+        ),
+        Index(
+            "ix_activity_max_hr_desc",
+            max_hr.desc(),
+            sqlite_where=max_hr.isnot(None),
+        ),
+        Index(
+            "ix_activity_calories_desc",
+            calories.desc(),
+            sqlite_where=calories.isnot(None),
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"<Activity {self.activity_id}: {self.name}>"
 
@@ -118,15 +202,15 @@ class Stream(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     activity_id = Column(String, ForeignKey("activities.activity_id"), unique=True, nullable=False)
 
-    # Downsampled lat/lon track as JSON array of [lat, lon] pairs
+    # Downsampled lat/lon track packed as a float32 blob of [lat, lon] pairs
     # Null if no GPS data
-    route = Column(JSON, nullable=True)
+    route_blob = Column("route", LargeBinary, nullable=True)
 
-    # Heart rate stream as JSON array
-    heart_rate = Column(JSON, nullable=True)
+    # Heart rate stream packed as an int16 blob
+    heart_rate_blob = Column("heart_rate", LargeBinary, nullable=True)
 
-    # Altitude stream as JSON array
-    altitude = Column(JSON, nullable=True)
+    # Altitude stream packed as a float32 blob
+    altitude_blob = Column("altitude", LargeBinary, nullable=True)
 
     # Has GPS flag for quick querying
     has_gps = Column(Boolean, default=False)
@@ -140,6 +224,37 @@ class Stream(Base):
     # Relationship
     activity = relationship("Activity", back_populates="stream")
 
+    # Partial index so GPS counts touch only the flagged rows
+    __table_args__ = (
+        Index("ix_stream_has_gps", has_gps, sqlite_where=has_gps == True),
+    )
+
+    # List-valued accessors so callers keep reading/writing plain lists;
+    # the pack/unpack to blobs happens here
+    @property
+    def route(self) -> list | None:
+        return unpack_stream(self.route_blob, STREAM_COORD_DTYPE, pairs=True)
+
+    @route.setter
+    def route(self, points: list | None) -> None:
+        self.route_blob = pack_stream(points, STREAM_COORD_DTYPE)
+
+    @property
+    def heart_rate(self) -> list | None:
+        return unpack_stream(self.heart_rate_blob, STREAM_HR_DTYPE)
+
+    @heart_rate.setter
+    def heart_rate(self, values: list | None) -> None:
+        self.heart_rate_blob = pack_stream(values, STREAM_HR_DTYPE)
+
+    @property
+    def altitude(self) -> list | None:
+        return unpack_stream(self.altitude_blob, STREAM_COORD_DTYPE)
+
+    @altitude.setter
+    def altitude(self, values: list | None) -> None:
+        self.altitude_blob = pack_stream(values, STREAM_COORD_DTYPE)
+
     def __repr__(self) -> str:
         gps_status = "with GPS" if self.has_gps else "no GPS"
         return f"<Stream {self.activity_id} ({gps_status})>"
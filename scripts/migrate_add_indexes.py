@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Add query indexes to the activities and streams tables.
+
+New databases get these from init_db(); run this script once to add them to
+existing databases. Safe to run multiple times - indexes that already exist
+are skipped.
+"""
+
+import sqlite3
+from pathlib import Path
+
+# Database path
+DB_PATH = Path(__file__).parent.parent / "data" / "strava_local.db"
+
+# Index name -> CREATE INDEX statement
+INDEXES = {
+    "ix_activity_start_time": (
+        "CREATE INDEX ix_activity_start_time ON activities (start_time DESC)"
+    ),
+    "ix_activity_type": (
+        "CREATE INDEX ix_activity_type ON activities (activity_type, distance)"
+    ),
+    "ix_activity_distance_desc": (
+        "CREATE INDEX ix_activity_distance_desc ON activities (distance DESC) "
+        "WHERE distance IS NOT NULL"
+    ),
+    "ix_activity_moving_time_desc": (
+        "CREATE INDEX ix_activity_moving_time_desc ON activities (moving_time DESC) "
+        "WHERE moving_time IS NOT NULL"
+    ),
+    "ix_activity_elevation_gain_desc": (
+        "CREATE INDEX ix_activity_elevation_gain_desc ON activities (elevation_gain DESC) "
+        "WHERE elevation_gain IS NOT NULL"
+    ),
+    "ix_activity_max_speed_desc": (
+        "CREATE INDEX ix_activity_max_speed_desc ON activities (max_speed DESC) "
+        "WHERE max_speed IS NOT NULL"
+    ),
+    "ix_activity_max_hr_desc": (
+        "CREATE INDEX ix_activity_max_hr_desc ON activities (max_hr DESC) "
+        "WHERE max_hr IS NOT NULL"
+    ),
+    "ix_activity_calories_desc": (
+        "CREATE INDEX ix_activity_calories_desc ON activities (calories DESC) "
+        "WHERE calories IS NOT NULL"
+    ),
+    "ix_stream_has_gps": (
+        "CREATE INDEX ix_stream_has_gps ON streams (has_gps) WHERE has_gps = 1"
+    ),
+}
+
+
+def index_exists(cursor: sqlite3.Cursor, name: str) -> bool:
+    """Check if an index exists."""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+    )
+    return cursor.fetchone() is not None
+
+
+def migrate():
+    """Add query indexes to the activities and streams tables."""
+    if not DB_PATH.exists():
+        print(f"Database not found at {DB_PATH}")
+        print("Run 'python -m scripts.ingest' first to create the database.")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    # Rebuild ix_activity_type if it predates the covering
+    # (activity_type, distance) form
+    if index_exists(cursor, "ix_activity_type"):
+        cursor.execute("PRAGMA index_info(ix_activity_type)")
+        columns = [row[2] for row in cursor.fetchall()]
+        if columns == ["activity_type"]:
+            print("Rebuilding ix_activity_type as a covering index")
+            cursor.execute("DROP INDEX ix_activity_type")
+
+    added = 0
+    for name, statement in INDEXES.items():
+        if not index_exists(cursor, name):
+            print(f"Adding index: {name}")
+            cursor.execute(statement)
+            added += 1
+        else:
+            print(f"Index already exists: {name}")
+
+    conn.commit()
+    conn.close()
+
+    if added > 0:
+        print(f"\nMigration complete! Added {added} new index(es).")
+    else:
+        print("\nNo migration needed - all indexes already exist.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Add generated time-period columns to the activities table.
+
+New databases get stored generated columns from init_db(). SQLite only
+allows ALTER TABLE to add VIRTUAL generated columns, so existing databases
+get virtual ones here - indexed, they behave the same for queries.
+Run this script once to migrate existing databases.
+Safe to run multiple times - it checks if columns exist first.
+"""
+
+import sqlite3
+from pathlib import Path
+
+# Database path
+DB_PATH = Path(__file__).parent.parent / "data" / "strava_local.db"
+
+# Column name -> strftime format for the generated period key
+PERIOD_COLUMNS = {
+    "start_year_month": "%Y-%m",
+    "start_year_week": "%Y-%W",
+    "start_year": "%Y",
+}
+
+
+def column_exists(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+    """Check if a column exists in a table.
+
+    Uses table_xinfo because table_info omits generated columns.
+    """
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    return column in columns
+
+
+def index_exists(cursor: sqlite3.Cursor, name: str) -> bool:
+    """Check if an index exists."""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+    )
+    return cursor.fetchone() is not None
+
+
+def migrate():
+    """Add generated period columns and their indexes."""
+    if not DB_PATH.exists():
+        print(f"Database not found at {DB_PATH}")
+        print("Run 'python -m scripts.ingest' first to create the database.")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    added = 0
+    for col_name, date_fmt in PERIOD_COLUMNS.items():
+        if not column_exists(cursor, "activities", col_name):
+            print(f"Adding column: {col_name}")
+            cursor.execute(
+                f"ALTER TABLE activities ADD COLUMN {col_name} TEXT "
+                f"GENERATED ALWAYS AS (strftime('{date_fmt}', start_time)) VIRTUAL"
+            )
+            added += 1
+        else:
+            print(f"Column already exists: {col_name}")
+
+        index_name = f"ix_activities_{col_name}"
+        if not index_exists(cursor, index_name):
+            print(f"Adding index: {index_name}")
+            cursor.execute(
+                f"CREATE INDEX {index_name} ON activities ({col_name})"
+            )
+
+    conn.commit()
+    conn.close()
+
+    if added > 0:
+        print(f"\nMigration complete! Added {added} new column(s).")
+    else:
+        print("\nNo migration needed - all columns already exist.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Convert JSON-encoded stream columns to packed binary blobs.
+
+Streams (route, heart_rate, altitude) used to be stored as JSON arrays;
+they are now packed numpy blobs (float32 coordinates/altitude, int16 heart
+rate). Run this script once to migrate existing databases.
+Safe to run multiple times - rows already stored as blobs are skipped.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+# Database path
+DB_PATH = Path(__file__).parent.parent / "data" / "strava_local.db"
+
+# Column name -> numpy dtype used for the packed blob
+STREAM_COLUMNS = {
+    "route": np.float32,
+    "heart_rate": np.int16,
+    "altitude": np.float32,
+}
+
+
+def migrate():
+    """Re-encode JSON stream values as packed blobs."""
+    if not DB_PATH.exists():
+        print(f"Database not found at {DB_PATH}")
+        print("Run 'python -m scripts.ingest' first to create the database.")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id, route, heart_rate, altitude FROM streams")
+    rows = cursor.fetchall()
+
+    converted = 0
+    for row_id, *values in rows:
+        updates = {}
+        for (column, dtype), value in zip(STREAM_COLUMNS.items(), values):
+            # JSON values come back as str; already-migrated blobs as bytes
+            if isinstance(value, str):
+                updates[column] = np.asarray(json.loads(value), dtype=dtype).tobytes()
+
+        if updates:
+            assignments = ", ".join(f"{column} = ?" for column in updates)
+            cursor.execute(
+                f"UPDATE streams SET {assignments} WHERE id = ?",
+                (*updates.values(), row_id),
+            )
+            converted += 1
+
+    conn.commit()
+    conn.close()
+
+    if converted > 0:
+        print(f"Migration complete! Converted {converted} stream row(s).")
+    else:
+        print("No migration needed - all streams already stored as blobs.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -166,7 +166,7 @@ async def strava_sync(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url="/settings?strava_error=not_connected", status_code=303)
 
     try:
-        stats = strava_service.sync_activities(db, profile)
+        stats = await strava_service.sync_activities_async(db, profile)
         return RedirectResponse(
             url=f"/settings?strava_synced=1&new={stats['new']}&updated={stats['updated']}",
             status_code=303,
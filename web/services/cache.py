@@ -0,0 +1,65 @@
+"""In-process TTL cache for dashboard aggregate queries.
+
+The dashboard aggregates only change when activities are imported, so their
+results are cached for a short window and cleared explicitly after a Strava
+sync. This is a single-process cache; a multi-worker deployment would need a
+shared store (e.g. Redis) with the same TTL semantics.
+"""
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable
+
+# How long cached aggregates stay fresh (seconds)
+CACHE_TTL_SECONDS = 60
+
+# Hard cap on entries; arbitrary cache keys (e.g. from query parameters)
+# must not grow the dict without bound
+CACHE_MAX_ENTRIES = 32
+
+_cache: dict[tuple, tuple[float, Any]] = {}
+_lock = threading.Lock()
+
+
+def _evict(now: float) -> None:
+    """Drop expired entries, then the oldest, until under the cap.
+
+    Must be called with _lock held.
+    """
+    for key in [k for k, (expires_at, _) in _cache.items() if expires_at <= now]:
+        del _cache[key]
+    while len(_cache) > CACHE_MAX_ENTRIES:
+        oldest = min(_cache, key=lambda k: _cache[k][0])
+        del _cache[oldest]
+
+
+def ttl_cache(func: Callable) -> Callable:
+    """Cache a service function's result for CACHE_TTL_SECONDS.
+
+    The first positional argument is assumed to be the database session and
+    is excluded from the cache key.
+    """
+
+    @wraps(func)
+    def wrapper(session, *args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        value = func(session, *args, **kwargs)
+        with _lock:
+            _cache[key] = (now + CACHE_TTL_SECONDS, value)
+            if len(_cache) > CACHE_MAX_ENTRIES:
+                _evict(now)
+        return value
+
+    return wrapper
+
+
+def clear_stats_cache() -> None:
+    """Drop all cached aggregates (called after an import changes the data)."""
+    with _lock:
+        _cache.clear()
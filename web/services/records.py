@@ -1,70 +1,92 @@
 """Personal records and performance analysis service."""
 from typing import Any
 
-from sqlalchemy import func, desc
+from sqlalchemy import and_, func, desc
 from sqlalchemy.orm import Session
 
 from db.models import Activity, Stream
+from web.services.cache import ttl_cache
 
 
+# Record name -> the Activity column it is the argmax of
+_RECORD_COLUMNS = {
+    "longest_distance": Activity.distance,
+    "longest_time": Activity.moving_time,
+    "highest_climb": Activity.elevation_gain,
+    "fastest_speed": Activity.max_speed,
+    "highest_hr": Activity.max_hr,
+    "most_calories": Activity.calories,
+}
+
+
+@ttl_cache
 def get_personal_records(session: Session) -> dict[str, Any]:
     """Get overall personal records across all activities."""
-    # Longest distance
-    longest = (
-        session.query(Activity)
-        .filter(Activity.distance.isnot(None))
-        .order_by(desc(Activity.distance))
-        .first()
-    )
 
-    # Longest time
-    longest_time = (
-        session.query(Activity)
-        .filter(Activity.moving_time.isnot(None))
-        .order_by(desc(Activity.moving_time))
-        .first()
-    )
+    def _record_holder_id(column):
+        return (
+            session.query(Activity.activity_id)
+            .filter(column.isnot(None))
+            .order_by(desc(column))
+            .limit(1)
+            .scalar_subquery()
+        )
 
-    # Highest elevation gain
-    highest_climb = (
-        session.query(Activity)
-        .filter(Activity.elevation_gain.isnot(None))
-        .order_by(desc(Activity.elevation_gain))
-        .first()
-    )
+    # One round-trip computes all six record-holder ids as scalar subselects,
+    # then one IN query hydrates the winning activities
+    ids = session.query(
+        *[_record_holder_id(column).label(name) for name, column in _RECORD_COLUMNS.items()]
+    ).one()
+
+    wanted = {activity_id for activity_id in ids if activity_id is not None}
+    by_id = {}
+    if wanted:
+        by_id = {
+            a.activity_id: a
+            for a in session.query(Activity).filter(Activity.activity_id.in_(wanted))
+        }
 
-    # Fastest speed (for activities with speed data)
-    fastest = (
-        session.query(Activity)
-        .filter(Activity.max_speed.isnot(None))
-        .order_by(desc(Activity.max_speed))
-        .first()
-    )
+    return {name: by_id.get(getattr(ids, name)) for name in _RECORD_COLUMNS}
 
-    # Highest heart rate
-    highest_hr = (
-        session.query(Activity)
-        .filter(Activity.max_hr.isnot(None))
-        .order_by(desc(Activity.max_hr))
-        .first()
+
+def _best_activity_per_type(
+    session: Session, column, *extra_filters
+) -> dict[str, Activity]:
+    """Map each activity type to its activity with the highest value for column.
+
+    Uses one grouped max subquery joined back to the activities table,
+    instead of one ORDER BY ... LIMIT 1 query per type.
+    """
+    subq = (
+        session.query(
+            Activity.activity_type.label("activity_type"),
+            func.max(column).label("best"),
+        )
+        .filter(Activity.activity_type.isnot(None))
+        .filter(column.isnot(None))
+        .filter(*extra_filters)
+        .group_by(Activity.activity_type)
+        .subquery()
     )
 
-    # Most calories
-    most_calories = (
+    rows = (
         session.query(Activity)
-        .filter(Activity.calories.isnot(None))
-        .order_by(desc(Activity.calories))
-        .first()
+        .join(
+            subq,
+            and_(
+                Activity.activity_type == subq.c.activity_type,
+                column == subq.c.best,
+            ),
+        )
+        .filter(*extra_filters)
+        .all()
     )
 
-    return {
-        "longest_distance": longest,
-        "longest_time": longest_time,
-        "highest_climb": highest_climb,
-        "fastest_speed": fastest,
-        "highest_hr": highest_hr,
-        "most_calories": most_calories,
-    }
+    # Ties on the max value produce multiple rows; keep one per type
+    best: dict[str, Activity] = {}
+    for activity in rows:
+        best.setdefault(activity.activity_type, activity)
+    return best
 
 
 def get_personal_records_by_type(session: Session) -> dict[str, dict[str, Any]]:
@@ -77,61 +99,39 @@ def get_personal_records_by_type(session: Session) -> dict[str, dict[str, Any]]:
         .all()
     )
 
-    records_by_type = {}
-
-    for (activity_type,) in types:
-        # Longest distance for this type
-        longest = (
-            session.query(Activity)
-            .filter(Activity.activity_type == activity_type)
-            .filter(Activity.distance.isnot(None))
-            .order_by(desc(Activity.distance))
-            .first()
-        )
-
-        # Fastest average speed for this type
-        fastest = (
-            session.query(Activity)
-            .filter(Activity.activity_type == activity_type)
-            .filter(Activity.avg_speed.isnot(None))
-            .filter(Activity.distance > 1000)  # At least 1km
-            .order_by(desc(Activity.avg_speed))
-            .first()
-        )
-
-        # Highest elevation for this type
-        highest_climb = (
-            session.query(Activity)
-            .filter(Activity.activity_type == activity_type)
-            .filter(Activity.elevation_gain.isnot(None))
-            .order_by(desc(Activity.elevation_gain))
-            .first()
-        )
+    longest = _best_activity_per_type(session, Activity.distance)
+    fastest = _best_activity_per_type(
+        session,
+        Activity.avg_speed,
+        Activity.distance > 1000,  # At least 1km
+    )
+    highest_climb = _best_activity_per_type(session, Activity.elevation_gain)
 
-        records_by_type[activity_type] = {
-            "longest_distance": longest,
-            "fastest_avg_speed": fastest,
-            "highest_climb": highest_climb,
+    return {
+        activity_type: {
+            "longest_distance": longest.get(activity_type),
+            "fastest_avg_speed": fastest.get(activity_type),
+            "highest_climb": highest_climb.get(activity_type),
         }
-
-    return records_by_type
+        for (activity_type,) in types
+    }
 
 
+@ttl_cache
 def get_hr_stats(session: Session) -> dict[str, Any]:
     """Get heart rate statistics."""
-    # Activities with HR data
-    hr_count = (
-        session.query(func.count(Activity.activity_id))
-        .filter(Activity.avg_hr.isnot(None))
-        .scalar()
-        or 0
-    )
-
-    if hr_count == 0:
+    # One pass: COUNT of a column only counts non-NULL rows
+    hr_count, avg_hr, max_hr_overall = session.query(
+        func.count(Activity.avg_hr),
+        func.avg(Activity.avg_hr),
+        func.max(Activity.max_hr),
+    ).one()
+
+    if not hr_count:
         return {"has_data": False}
 
-    avg_hr = session.query(func.avg(Activity.avg_hr)).scalar() or 0
-    max_hr_overall = session.query(func.max(Activity.max_hr)).scalar() or 0
+    avg_hr = avg_hr or 0
+    max_hr_overall = max_hr_overall or 0
 
     return {
         "has_data": True,
@@ -2,24 +2,33 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from db.models import Activity, Stream, FitFile
+from web.services.cache import ttl_cache
 
 
+@ttl_cache
 def get_summary_stats(session: Session) -> dict[str, Any]:
     """Get summary statistics for the dashboard."""
-    total = session.query(func.count(Activity.activity_id)).scalar() or 0
-    with_gps = (
-        session.query(func.count(Stream.id)).filter(Stream.has_gps == True).scalar()
-        or 0
+    # All aggregates in one pass; streams are 1:1 with activities so the
+    # outer join folds the GPS count in without inflating the other counts
+    total, with_gps, total_distance, total_time, min_date, max_date = (
+        session.query(
+            func.count(Activity.activity_id),
+            func.coalesce(func.sum(case((Stream.has_gps == True, 1), else_=0)), 0),
+            func.sum(Activity.distance),
+            func.sum(Activity.moving_time),
+            func.min(Activity.start_time),
+            func.max(Activity.start_time),
+        )
+        .outerjoin(Stream, Stream.activity_id == Activity.activity_id)
+        .one()
     )
-    total_distance = session.query(func.sum(Activity.distance)).scalar() or 0
-    total_time = session.query(func.sum(Activity.moving_time)).scalar() or 0
-
-    min_date = session.query(func.min(Activity.start_time)).scalar()
-    max_date = session.query(func.max(Activity.start_time)).scalar()
+    total = total or 0
+    total_distance = total_distance or 0
+    total_time = total_time or 0
 
     return {
         "total_activities": total,
@@ -32,6 +41,7 @@ def get_summary_stats(session: Session) -> dict[str, Any]:
     }
 
 
+@ttl_cache
 def get_activity_type_breakdown(session: Session) -> list[dict[str, Any]]:
     """Get activity counts and distance by type."""
     results = (
@@ -56,26 +66,27 @@ def get_activity_type_breakdown(session: Session) -> list[dict[str, Any]]:
     ]
 
 
+@ttl_cache
 def get_activities_over_time(
     session: Session, grouping: str = "month"
 ) -> list[dict[str, Any]]:
     """Get activity counts grouped by time period."""
     if grouping == "month":
-        date_fmt = "%Y-%m"
+        period_col = Activity.start_year_month
     elif grouping == "week":
-        date_fmt = "%Y-%W"
+        period_col = Activity.start_year_week
     else:
-        date_fmt = "%Y"
+        period_col = Activity.start_year
 
     results = (
         session.query(
-            func.strftime(date_fmt, Activity.start_time).label("period"),
+            period_col.label("period"),
             func.count(Activity.activity_id).label("count"),
             func.sum(Activity.distance).label("distance"),
         )
         .filter(Activity.start_time.isnot(None))
-        .group_by("period")
-        .order_by("period")
+        .group_by(period_col)
+        .order_by(period_col)
         .all()
     )
 
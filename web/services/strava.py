@@ -1,14 +1,28 @@
 """Strava API integration service."""
 
+import asyncio
 import time
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import datetime, timezone
 from typing import Optional
 from urllib.parse import urlencode
 
 import httpx
+import numpy as np
+from sqlalchemy import text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from db.models import AthleteProfile, Activity, Stream, FitFile
+from db.models import (
+    STREAM_COORD_DTYPE,
+    STREAM_HR_DTYPE,
+    Activity,
+    AthleteProfile,
+    FitFile,
+    Stream,
+    pack_stream,
+)
+from web.services.cache import clear_stats_cache
 
 
 # Strava API endpoints
@@ -16,6 +30,24 @@ STRAVA_AUTH_URL = "https://www.strava.com/oauth/authorize"
 STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"
 STRAVA_API_BASE = "https://www.strava.com/api/v3"
 
+# Connection pool limits for a sync run (one TCP+TLS handshake, many requests)
+STRAVA_CLIENT_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+
+# Max concurrent stream requests during a sync (stays well inside Strava's
+# rate limits)
+STREAM_FETCH_CONCURRENCY = 8
+
+
+def _http_client(client: Optional[httpx.Client]):
+    """Return a context manager yielding an HTTP client.
+
+    Reuses the caller's pooled client when given, otherwise creates a
+    short-lived one for standalone calls.
+    """
+    if client is not None:
+        return nullcontext(client)
+    return httpx.Client()
+
 
 def get_authorization_url(client_id: str, redirect_uri: str) -> str:
     """Generate the Strava OAuth authorization URL."""
@@ -32,10 +64,11 @@ def exchange_code_for_tokens(
     client_id: str,
     client_secret: str,
     code: str,
+    client: Optional[httpx.Client] = None,
 ) -> dict:
     """Exchange authorization code for access and refresh tokens."""
-    with httpx.Client() as client:
-        response = client.post(
+    with _http_client(client) as http:
+        response = http.post(
             STRAVA_TOKEN_URL,
             data={
                 "client_id": client_id,
@@ -52,10 +85,11 @@ def refresh_access_token(
     client_id: str,
     client_secret: str,
     refresh_token: str,
+    client: Optional[httpx.Client] = None,
 ) -> dict:
     """Refresh an expired access token."""
-    with httpx.Client() as client:
-        response = client.post(
+    with _http_client(client) as http:
+        response = http.post(
             STRAVA_TOKEN_URL,
             data={
                 "client_id": client_id,
@@ -85,11 +119,20 @@ def get_valid_access_token(db: Session, profile: AthleteProfile) -> Optional[str
                 profile.strava_client_secret,
                 profile.strava_refresh_token,
             )
-            # Update stored tokens
-            profile.strava_access_token = tokens["access_token"]
-            profile.strava_refresh_token = tokens["refresh_token"]
-            profile.strava_token_expires_at = tokens["expires_at"]
+            # Persist the new tokens with a targeted UPDATE instead of
+            # dirtying the profile object, so a mid-sync refresh only writes
+            # the token columns
+            db.execute(
+                update(AthleteProfile)
+                .where(AthleteProfile.id == profile.id)
+                .values(
+                    strava_access_token=tokens["access_token"],
+                    strava_refresh_token=tokens["refresh_token"],
+                    strava_token_expires_at=tokens["expires_at"],
+                )
+            )
             db.commit()
+            db.refresh(profile)
         except Exception:
             return None
 
@@ -101,14 +144,15 @@ def fetch_activities(
     after: Optional[int] = None,
     per_page: int = 50,
     page: int = 1,
+    client: Optional[httpx.Client] = None,
 ) -> list[dict]:
     """Fetch activities from Strava API."""
     params = {"per_page": per_page, "page": page}
     if after:
         params["after"] = after
 
-    with httpx.Client() as client:
-        response = client.get(
+    with _http_client(client) as http:
+        response = http.get(
             f"{STRAVA_API_BASE}/athlete/activities",
             headers={"Authorization": f"Bearer {access_token}"},
             params=params,
@@ -120,10 +164,11 @@ def fetch_activities(
 def fetch_activity_streams(
     access_token: str,
     activity_id: int,
+    client: Optional[httpx.Client] = None,
 ) -> dict:
     """Fetch detailed streams for a specific activity."""
-    with httpx.Client() as client:
-        response = client.get(
+    with _http_client(client) as http:
+        response = http.get(
             f"{STRAVA_API_BASE}/activities/{activity_id}/streams",
             headers={"Authorization": f"Bearer {access_token}"},
             params={
@@ -137,9 +182,57 @@ def fetch_activity_streams(
         return response.json()
 
 
-def sync_activities(db: Session, profile: AthleteProfile) -> dict:
+async def _fetch_activities_async(
+    client: httpx.AsyncClient,
+    access_token: str,
+    after: Optional[int] = None,
+    per_page: int = 50,
+    page: int = 1,
+) -> list[dict]:
+    """Fetch a page of activities from the Strava API."""
+    params = {"per_page": per_page, "page": page}
+    if after:
+        params["after"] = after
+
+    response = await client.get(
+        f"{STRAVA_API_BASE}/athlete/activities",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params=params,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _fetch_activity_streams_async(
+    client: httpx.AsyncClient,
+    access_token: str,
+    activity_id: int,
+    semaphore: asyncio.Semaphore,
+) -> dict:
+    """Fetch streams for one activity, bounded by the shared semaphore."""
+    async with semaphore:
+        response = await client.get(
+            f"{STRAVA_API_BASE}/activities/{activity_id}/streams",
+            headers={"Authorization": f"Bearer {access_token}"},
+            params={
+                "keys": "latlng,heartrate,altitude,time",
+                "key_by_type": "true",
+            },
+        )
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return response.json()
+
+
+async def sync_activities_async(db: Session, profile: AthleteProfile) -> dict:
     """Sync activities from Strava API to local database.
 
+    The whole sync shares one pooled async client: the next page downloads
+    while the current page's streams are fetched, and stream requests run
+    concurrently capped at STREAM_FETCH_CONCURRENCY. Database writes stay
+    in this task and are applied in bulk once per page.
+
     Returns dict with sync statistics.
     """
     access_token = get_valid_access_token(db, profile)
@@ -158,125 +251,298 @@ def sync_activities(db: Session, profile: AthleteProfile) -> dict:
     if profile.strava_last_sync:
         after_timestamp = int(profile.strava_last_sync.timestamp())
 
-    page = 1
-    while True:
-        activities = fetch_activities(
-            access_token,
-            after=after_timestamp,
-            per_page=50,
-            page=page,
-        )
-
-        if not activities:
-            break
+    semaphore = asyncio.Semaphore(STREAM_FETCH_CONCURRENCY)
 
-        stats["fetched"] += len(activities)
+    async with httpx.AsyncClient(limits=STRAVA_CLIENT_LIMITS) as client:
+        page = 1
+        next_page = asyncio.create_task(
+            _fetch_activities_async(
+                client, access_token, after=after_timestamp, page=page
+            )
+        )
 
-        for activity_data in activities:
-            try:
-                result = import_strava_activity(db, access_token, activity_data)
-                if result == "new":
-                    stats["new"] += 1
-                elif result == "updated":
-                    stats["updated"] += 1
-            except Exception as e:
+        while True:
+            activities = await next_page
+            if not activities:
+                break
+
+            stats["fetched"] += len(activities)
+
+            # Start downloading the next page while this one is processed
+            # (page 20 is the safety limit)
+            page += 1
+            next_page = None
+            if page <= 20:
+                next_page = asyncio.create_task(
+                    _fetch_activities_async(
+                        client, access_token, after=after_timestamp, page=page
+                    )
+                )
+
+            # Entries without an id can't be imported; count them as errors
+            # here so the prefetch below can't blow up the whole sync
+            malformed = [a for a in activities if "id" not in a]
+            for activity_data in malformed:
                 stats["errors"] += 1
-                print(f"Error importing activity {activity_data.get('id')}: {e}")
-
-        page += 1
+                print(f"Error importing activity {activity_data.get('id')}: missing id")
+            if malformed:
+                activities = [a for a in activities if "id" in a]
+
+            # One IN query for the page instead of an existence check per
+            # activity
+            page_ids = [str(a["id"]) for a in activities]
+            existing_ids = {
+                aid
+                for (aid,) in db.query(Activity.activity_id).filter(
+                    Activity.activity_id.in_(page_ids)
+                )
+            }
+            # Activities whose streams are already stored (e.g. from a
+            # partially failed earlier run) don't need another API call
+            existing_stream_ids = {
+                sid
+                for (sid,) in db.query(Stream.activity_id).filter(
+                    Stream.activity_id.in_(page_ids)
+                )
+            }
+
+            rows: list[dict] = []
+            stream_fetches: list[tuple[str, asyncio.Task]] = []
+
+            for activity_data in activities:
+                try:
+                    row = _build_activity_row(activity_data)
+                except Exception as e:
+                    stats["errors"] += 1
+                    print(f"Error importing activity {activity_data.get('id')}: {e}")
+                    continue
+
+                rows.append(row)
+                activity_id = row["activity_id"]
+                if activity_id in existing_ids:
+                    stats["updated"] += 1
+                else:
+                    stats["new"] += 1
+                    if (
+                        activity_data.get("start_latlng")
+                        and activity_id not in existing_stream_ids
+                    ):
+                        stream_fetches.append(
+                            (
+                                activity_id,
+                                asyncio.create_task(
+                                    _fetch_activity_streams_async(
+                                        client,
+                                        access_token,
+                                        int(activity_id),
+                                        semaphore,
+                                    )
+                                ),
+                            )
+                        )
+
+            new_streams: list[dict] = []
+            for activity_id, task in stream_fetches:
+                try:
+                    streams_data = await task
+                    if streams_data:
+                        new_streams.append(_build_stream_row(activity_id, streams_data))
+                except Exception as e:
+                    print(f"Error fetching streams for {activity_id}: {e}")
+
+            # Apply the whole page in bulk so SQLite fsyncs once per page
+            # instead of once per activity
+            if rows:
+                db.execute(_activity_upsert(), rows)
+            if new_streams:
+                db.bulk_insert_mappings(Stream, new_streams)
+            db.commit()
 
-        # Safety limit
-        if page > 20:
-            break
+            if next_page is None:
+                break
 
     # Update last sync time
     profile.strava_last_sync = datetime.utcnow()
     db.commit()
 
+    # Refresh planner statistics after a bulk import so SQLite keeps picking
+    # the covering indexes as the table grows
+    if stats["new"] or stats["updated"]:
+        db.execute(text("ANALYZE"))
+
+    # Imported activities invalidate cached dashboard aggregates
+    clear_stats_cache()
+
     return stats
 
 
-def import_strava_activity(
+def sync_activities(db: Session, profile: AthleteProfile) -> dict:
+    """Synchronous wrapper around sync_activities_async."""
+    return asyncio.run(sync_activities_async(db, profile))
+
+
+# Strava summary field -> Activity column, compiled once instead of a dozen
+# hand-written .get() lines per activity
+_STRAVA_FIELD_MAP = (
+    ("name", "name"),
+    ("type", "activity_type"),
+    ("distance", "distance"),
+    ("moving_time", "moving_time"),
+    ("elapsed_time", "elapsed_time"),
+    ("average_speed", "avg_speed"),
+    ("max_speed", "max_speed"),
+    ("average_heartrate", "avg_hr"),
+    ("max_heartrate", "max_hr"),
+    ("total_elevation_gain", "elevation_gain"),
+    ("elev_low", "elevation_low"),
+    ("elev_high", "elevation_high"),
+    ("calories", "calories"),
+)
+
+
+def _parse_start_date(value: str) -> datetime:
+    """Parse Strava's start_date, which is always UTC with a Z suffix."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(
+            tzinfo=timezone.utc
+        )
+    except ValueError:
+        # Defensive fallback should Strava ever change the format
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _build_activity_row(activity_data: dict) -> dict:
+    """Build an Activity column mapping from a Strava API summary dict."""
+    row = {column: activity_data.get(key) for key, column in _STRAVA_FIELD_MAP}
+    row["activity_id"] = str(activity_data["id"])
+    row["start_time"] = (
+        _parse_start_date(activity_data["start_date"])
+        if activity_data.get("start_date")
+        else None
+    )
+    row["elevation_loss"] = None  # Not in summary
+    return row
+
+
+def _activity_upsert():
+    """INSERT ... ON CONFLICT(activity_id) DO UPDATE for activity rows.
+
+    One statement covers both new and already-imported activities, so the
+    import needs no separate insert and update paths. On conflict,
+    elevation_loss is left alone (the summary payload cannot provide it, and
+    file ingestion may have) and updated_at is bumped like the old ORM
+    update path did.
+    """
+    stmt = sqlite_insert(Activity)
+    refresh_keys = (
+        "name",
+        "activity_type",
+        "start_time",
+        "distance",
+        "moving_time",
+        "elapsed_time",
+        "avg_speed",
+        "max_speed",
+        "avg_hr",
+        "max_hr",
+        "elevation_gain",
+        "elevation_low",
+        "elevation_high",
+        "calories",
+    )
+    set_ = {key: stmt.excluded[key] for key in refresh_keys}
+    set_["updated_at"] = datetime.utcnow()
+    return stmt.on_conflict_do_update(index_elements=["activity_id"], set_=set_)
+
+
+def _prepare_strava_activity(
     db: Session,
     access_token: str,
     activity_data: dict,
-) -> str:
-    """Import a single activity from Strava API data.
-
-    Returns 'new', 'updated', or 'skipped'.
+    client: Optional[httpx.Client] = None,
+    existing_ids: Optional[set[str]] = None,
+) -> tuple[str, dict, Optional[dict]]:
+    """Build column mappings for one Strava activity without touching the DB.
+
+    Returns (status, activity_row, stream_row) where status is 'new' or
+    'updated' and stream_row is None unless streams were fetched.
+    The caller may pass a pre-fetched set of known activity ids to avoid a
+    per-activity existence query.
     """
     activity_id = str(activity_data["id"])
 
     # Check if activity already exists
-    existing = db.query(Activity).filter_by(activity_id=activity_id).first()
-
-    # Parse start time
-    start_time = None
-    if activity_data.get("start_date"):
-        start_time = datetime.fromisoformat(activity_data["start_date"].replace("Z", "+00:00"))
-
-    if existing:
-        # Update existing activity
-        existing.name = activity_data.get("name")
-        existing.activity_type = activity_data.get("type")
-        existing.start_time = start_time
-        existing.distance = activity_data.get("distance")
-        existing.moving_time = activity_data.get("moving_time")
-        existing.elapsed_time = activity_data.get("elapsed_time")
-        existing.avg_speed = activity_data.get("average_speed")
-        existing.max_speed = activity_data.get("max_speed")
-        existing.avg_hr = activity_data.get("average_heartrate")
-        existing.max_hr = activity_data.get("max_heartrate")
-        existing.elevation_gain = activity_data.get("total_elevation_gain")
-        existing.calories = activity_data.get("calories")
-        db.commit()
-        return "updated"
-
-    # Create new activity
-    activity = Activity(
-        activity_id=activity_id,
-        name=activity_data.get("name"),
-        activity_type=activity_data.get("type"),
-        start_time=start_time,
-        distance=activity_data.get("distance"),
-        moving_time=activity_data.get("moving_time"),
-        elapsed_time=activity_data.get("elapsed_time"),
-        avg_speed=activity_data.get("average_speed"),
-        max_speed=activity_data.get("max_speed"),
-        avg_hr=activity_data.get("average_heartrate"),
-        max_hr=activity_data.get("max_heartrate"),
-        elevation_gain=activity_data.get("total_elevation_gain"),
-        elevation_loss=None,  # Not in summary
-        elevation_low=activity_data.get("elev_low"),
-        elevation_high=activity_data.get("elev_high"),
-        calories=activity_data.get("calories"),
-    )
-    db.add(activity)
+    if existing_ids is not None:
+        exists = activity_id in existing_ids
+    else:
+        exists = (
+            db.query(Activity.activity_id).filter_by(activity_id=activity_id).scalar()
+            is not None
+        )
 
-    # Fetch and import streams if activity has GPS data
-    if activity_data.get("start_latlng"):
+    row = _build_activity_row(activity_data)
+
+    if exists:
+        return "updated", row, None
+
+    # Fetch streams if the new activity has GPS data and none are stored yet
+    stream_row = None
+    has_stream = (
+        db.query(Stream.activity_id).filter_by(activity_id=activity_id).scalar()
+        is not None
+    )
+    if activity_data.get("start_latlng") and not has_stream:
         try:
-            streams_data = fetch_activity_streams(access_token, int(activity_id))
+            streams_data = fetch_activity_streams(
+                access_token, int(activity_id), client=client
+            )
             if streams_data:
-                import_activity_streams(db, activity_id, streams_data)
+                stream_row = _build_stream_row(activity_id, streams_data)
         except Exception as e:
             print(f"Error fetching streams for {activity_id}: {e}")
 
-    db.commit()
-    return "new"
+    return "new", row, stream_row
 
 
-def import_activity_streams(
+def import_strava_activity(
     db: Session,
-    activity_id: str,
-    streams_data: dict,
-) -> None:
-    """Import stream data for an activity."""
-    # Check if stream already exists
-    existing = db.query(Stream).filter_by(activity_id=activity_id).first()
-    if existing:
-        return
+    access_token: str,
+    activity_data: dict,
+    client: Optional[httpx.Client] = None,
+) -> str:
+    """Import a single activity from Strava API data.
+
+    Returns 'new' or 'updated'.
+    """
+    status, row, stream_row = _prepare_strava_activity(
+        db, access_token, activity_data, client=client
+    )
+
+    db.execute(_activity_upsert(), [row])
+    if stream_row:
+        db.bulk_insert_mappings(Stream, [stream_row])
+
+    db.commit()
+    clear_stats_cache()
+    return status
+
+
+def _downsample(stream: list, max_points: int = 500) -> list:
+    """Downsample a stream to at most max_points evenly spaced samples.
+
+    The index arithmetic runs in NumPy instead of a Python loop; [lat, lng]
+    pairs come back as nested lists with the pair structure preserved.
+    """
+    if len(stream) <= max_points:
+        return stream
 
+    arr = np.asarray(stream)
+    indices = np.linspace(0, len(arr) - 1, max_points).astype(np.int64)
+    return arr[indices].tolist()
+
+
+def _build_stream_row(activity_id: str, streams_data: dict) -> dict:
+    """Build a Stream column mapping from Strava API stream data."""
     # Extract GPS route
     route = None
     has_gps = False
@@ -290,41 +556,47 @@ def import_activity_streams(
             has_gps = True
 
             # Downsample if needed (max 500 points)
-            if len(route) > 500:
-                step = len(route) / 500
-                route = [route[int(i * step)] for i in range(500)]
+            route = _downsample(route)
 
     # Extract heart rate
     heart_rate = None
     if "heartrate" in streams_data:
         hr_stream = streams_data["heartrate"]
         if hr_stream.get("data"):
-            heart_rate = hr_stream["data"]
-            # Downsample if needed
-            if len(heart_rate) > 500:
-                step = len(heart_rate) / 500
-                heart_rate = [heart_rate[int(i * step)] for i in range(500)]
+            heart_rate = _downsample(hr_stream["data"])
 
     # Extract altitude
     altitude = None
     if "altitude" in streams_data:
         alt_stream = streams_data["altitude"]
         if alt_stream.get("data"):
-            altitude = alt_stream["data"]
-            # Downsample if needed
-            if len(altitude) > 500:
-                step = len(altitude) / 500
-                altitude = [altitude[int(i * step)] for i in range(500)]
-
-    stream = Stream(
-        activity_id=activity_id,
-        route=route,
-        heart_rate=heart_rate,
-        altitude=altitude,
-        has_gps=has_gps,
-        original_point_count=original_point_count,
+            altitude = _downsample(alt_stream["data"])
+
+    return {
+        "activity_id": activity_id,
+        "route_blob": pack_stream(route, STREAM_COORD_DTYPE),
+        "heart_rate_blob": pack_stream(heart_rate, STREAM_HR_DTYPE),
+        "altitude_blob": pack_stream(altitude, STREAM_COORD_DTYPE),
+        "has_gps": has_gps,
+        "original_point_count": original_point_count,
+    }
+
+
+def import_activity_streams(
+    db: Session,
+    activity_id: str,
+    streams_data: dict,
+) -> None:
+    """Import stream data for an activity."""
+    # Id-only existence check; loading the row would decode the blobs for
+    # nothing
+    exists = (
+        db.query(Stream.id).filter_by(activity_id=activity_id).first() is not None
     )
-    db.add(stream)
+    if exists:
+        return
+
+    db.add(Stream(**_build_stream_row(activity_id, streams_data)))
 
 
 def is_connected(profile: AthleteProfile) -> bool: